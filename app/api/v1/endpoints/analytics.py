@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import func, extract
 from typing import List
 from datetime import datetime, timedelta
-from app.db.session import get_db
+from app.core.admission import limit_date_range
+from app.db.session import get_analytics_db
 from app.models.models import Sale, Product, Category
+from app.services import analytics_snapshot, sales_archive
 from app.schemas.schemas import (
     SalesAnalyticsResponse,
     SalesComparisonResponse,
@@ -16,69 +18,139 @@ router = APIRouter()
 
 @router.get("/revenue/daily", response_model=List[dict])
 def get_daily_revenue(
+    response: Response,
     days: int = 7,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_analytics_db)
 ):
     end_date = datetime.utcnow()
     start_date = end_date - timedelta(days=days)
+    start_date, end_date = limit_date_range(start_date, end_date, response)
     
-    daily_revenue = db.query(
+    snapshot = analytics_snapshot.get_snapshot()
+    snapshot_days = snapshot.whole_days(start_date, end_date) if snapshot is not None else None
+    
+    query = db.query(
         func.date(Sale.sale_date).label('date'),
         func.sum(Sale.total_amount).label('revenue'),
         func.count(Sale.id).label('order_count')
     ).filter(
         Sale.sale_date >= start_date,
         Sale.sale_date <= end_date
-    ).group_by(
+    )
+    if snapshot_days:
+        # Whole days come from the snapshot, only the partial ones are queried
+        query = query.filter(analytics_snapshot.outside(snapshot_days))
+    
+    daily_revenue = query.group_by(
         func.date(Sale.sale_date)
     ).all()
     
-    return [
-        {
+    days = {
+        str(revenue.date): {
             "date": str(revenue.date),
             "revenue": float(revenue.revenue),
             "order_count": revenue.order_count
         }
         for revenue in daily_revenue
-    ]
+    }
+    
+    if snapshot_days:
+        for day in snapshot.daily_totals(*snapshot_days):
+            totals = days.setdefault(
+                str(day["date"]), {"date": str(day["date"]), "revenue": 0.0, "order_count": 0}
+            )
+            totals["revenue"] += day["revenue"]
+            totals["order_count"] += day["order_count"]
+    
+    return sorted(days.values(), key=lambda day: day["date"])
 
 @router.get("/revenue/monthly", response_model=List[dict])
 def get_monthly_revenue(
+    response: Response,
     months: int = 12,
-    db: Session = Depends(get_db)
+    start_date: datetime = None,
+    end_date: datetime = None,
+    db: Session = Depends(get_analytics_db)
 ):
-    end_date = datetime.utcnow()
-    start_date = end_date - timedelta(days=30 * months)
+    # An explicit range is needed to reach back to archived months
+    if start_date is None and end_date is None:
+        end_date = datetime.utcnow()
+        start_date = end_date - timedelta(days=30 * months)
+    start_date, end_date = limit_date_range(start_date, end_date, response)
+    
+    # With the range limit disabled a half-open range comes back unchanged
+    if end_date is None:
+        end_date = datetime.utcnow()
+    if start_date is None:
+        start_date = end_date - timedelta(days=30 * months)
     
-    monthly_revenue = db.query(
+    hot_start = sales_archive.hot_start()
+    hot_start_date = sales_archive.hot_range_start(start_date, hot_start)
+    
+    snapshot = analytics_snapshot.get_snapshot()
+    snapshot_days = snapshot.whole_days(hot_start_date, end_date) if snapshot is not None else None
+    
+    query = db.query(
         extract('year', Sale.sale_date).label('year'),
         extract('month', Sale.sale_date).label('month'),
         func.sum(Sale.total_amount).label('revenue'),
         func.count(Sale.id).label('order_count')
     ).filter(
-        Sale.sale_date >= start_date,
+        Sale.sale_date >= hot_start_date,
         Sale.sale_date <= end_date
-    ).group_by(
+    )
+    if snapshot_days:
+        query = query.filter(analytics_snapshot.outside(snapshot_days))
+    
+    monthly_revenue = query.group_by(
         extract('year', Sale.sale_date),
         extract('month', Sale.sale_date)
     ).all()
     
-    return [
-        {
+    months = {
+        (int(revenue.year), int(revenue.month)): {
             "year": int(revenue.year),
             "month": int(revenue.month),
             "revenue": float(revenue.revenue),
             "order_count": revenue.order_count
         }
         for revenue in monthly_revenue
-    ]
+    }
+    
+    if snapshot_days:
+        for month in snapshot.monthly_totals(*snapshot_days):
+            totals = months.setdefault(
+                (month["year"], month["month"]),
+                {"year": month["year"], "month": month["month"], "revenue": 0.0, "order_count": 0}
+            )
+            totals["revenue"] += month["revenue"]
+            totals["order_count"] += month["order_count"]
+    
+    # Add sales that were moved to the archive
+    for (year, month), archived in sales_archive.monthly_totals(start_date, end_date, hot_start).items():
+        totals = months.setdefault(
+            (year, month), {"year": year, "month": month, "revenue": 0.0, "order_count": 0}
+        )
+        totals["revenue"] += archived["revenue"]
+        totals["order_count"] += archived["order_count"]
+    
+    return sorted(months.values(), key=lambda month: (month["year"], month["month"]))
 
 @router.get("/revenue/by-category", response_model=List[dict])
 def get_revenue_by_category(
+    response: Response,
     start_date: datetime = None,
     end_date: datetime = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_analytics_db)
 ):
+    start_date, end_date = limit_date_range(start_date, end_date, response)
+    
+    hot_start = sales_archive.hot_start()
+    hot_start_date = sales_archive.hot_range_start(start_date, hot_start)
+    
+    snapshot = analytics_snapshot.get_snapshot()
+    snapshot_days = snapshot.whole_days(hot_start_date, end_date) if snapshot is not None else None
+    
     query = db.query(
         Category.id,
         Category.name,
@@ -90,46 +162,85 @@ def get_revenue_by_category(
         Sale, Product.id == Sale.product_id
     )
     
-    if start_date:
-        query = query.filter(Sale.sale_date >= start_date)
+    if hot_start_date:
+        query = query.filter(Sale.sale_date >= hot_start_date)
     if end_date:
         query = query.filter(Sale.sale_date <= end_date)
+    if snapshot_days:
+        query = query.filter(analytics_snapshot.outside(snapshot_days))
     
     results = query.group_by(Category.id, Category.name).all()
     
-    return [
-        {
+    categories = {
+        result.id: {
             "category_id": result.id,
             "category_name": result.name,
             "revenue": float(result.revenue),
             "total_quantity": result.total_quantity
         }
         for result in results
-    ]
+    }
+    
+    if snapshot_days:
+        for category in snapshot.category_totals(*snapshot_days):
+            totals = categories.setdefault(category["category_id"], {
+                "category_id": category["category_id"],
+                "category_name": category["category_name"],
+                "revenue": 0.0,
+                "total_quantity": 0
+            })
+            totals["revenue"] += category["revenue"]
+            totals["total_quantity"] += category["quantity"]
+    
+    # Add sales that were moved to the archive
+    for category_id, archived in sales_archive.category_totals(db, start_date, end_date, hot_start).items():
+        totals = categories.setdefault(category_id, {
+            "category_id": category_id,
+            "category_name": archived["category_name"],
+            "revenue": 0.0,
+            "total_quantity": 0
+        })
+        totals["revenue"] += archived["revenue"]
+        totals["total_quantity"] += archived["quantity"]
+    
+    return list(categories.values())
+
+def _period_revenue(db: Session, snapshot, start_date: datetime, end_date: datetime) -> float:
+    hot_start = sales_archive.hot_start()
+    hot_start_date = sales_archive.hot_range_start(start_date, hot_start)
+    snapshot_days = snapshot.whole_days(hot_start_date, end_date) if snapshot is not None else None
+    
+    query = db.query(
+        func.sum(Sale.total_amount).label('revenue')
+    ).filter(
+        Sale.sale_date >= hot_start_date,
+        Sale.sale_date <= end_date
+    )
+    if snapshot_days:
+        query = query.filter(analytics_snapshot.outside(snapshot_days))
+    
+    revenue = float(query.scalar() or 0)
+    if snapshot_days:
+        revenue += snapshot.total_revenue(*snapshot_days)
+    
+    # Add sales that were moved to the archive
+    return revenue + sales_archive.total_revenue(start_date, end_date, hot_start)
 
 @router.get("/revenue/compare", response_model=dict)
 def compare_revenue(
+    response: Response,
     period1_start: datetime,
     period1_end: datetime,
     period2_start: datetime,
     period2_end: datetime,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_analytics_db)
 ):
-    # Get revenue for period 1
-    period1_revenue = db.query(
-        func.sum(Sale.total_amount).label('revenue')
-    ).filter(
-        Sale.sale_date >= period1_start,
-        Sale.sale_date <= period1_end
-    ).scalar() or 0
+    period1_start, period1_end = limit_date_range(period1_start, period1_end, response)
+    period2_start, period2_end = limit_date_range(period2_start, period2_end, response)
     
-    # Get revenue for period 2
-    period2_revenue = db.query(
-        func.sum(Sale.total_amount).label('revenue')
-    ).filter(
-        Sale.sale_date >= period2_start,
-        Sale.sale_date <= period2_end
-    ).scalar() or 0
+    snapshot = analytics_snapshot.get_snapshot()
+    period1_revenue = _period_revenue(db, snapshot, period1_start, period1_end)
+    period2_revenue = _period_revenue(db, snapshot, period2_start, period2_end)
     
     # Calculate percentage change
     if period1_revenue == 0:
@@ -1,52 +1,86 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
+from sqlalchemy import exists, func, lambda_stmt, select
 from typing import List
 from datetime import datetime
+from app.core.config import settings
 from app.db.session import get_db
 from app.models.models import Inventory, InventoryHistory, Product
+from app.services import history_journal, inventory_shards
 from app.schemas.schemas import InventoryCreate, Inventory as InventorySchema, InventoryHistory as InventoryHistorySchema
 
 router = APIRouter()
 
 @router.post("/", response_model=InventorySchema)
 def create_inventory(inventory: InventoryCreate, db: Session = Depends(get_db)):
+    product_id = inventory.product_id
+    
     # Check if product exists
-    product = db.query(Product).filter(Product.id == inventory.product_id).first()
-    if not product:
+    product_exists = db.execute(lambda_stmt(
+        lambda: select(exists().where(Product.id == product_id))
+    )).scalar()
+    if not product_exists:
         raise HTTPException(status_code=404, detail="Product not found")
     
     # Check if inventory already exists
-    existing_inventory = db.query(Inventory).filter(Inventory.product_id == inventory.product_id).first()
-    if existing_inventory:
+    inventory_exists = db.execute(lambda_stmt(
+        lambda: select(exists().where(Inventory.product_id == product_id))
+    )).scalar()
+    if inventory_exists:
         raise HTTPException(status_code=400, detail="Inventory already exists for this product")
     
     db_inventory = Inventory(**inventory.model_dump())
     db.add(db_inventory)
+    if settings.INVENTORY_SHARDING_ENABLED:
+        db.flush()
+        inventory_shards.ensure_shards(db, db_inventory.id)
     db.commit()
     db.refresh(db_inventory)
     return db_inventory
 
 @router.get("/", response_model=List[InventorySchema])
 def read_inventory(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    inventory = db.query(Inventory).offset(skip).limit(limit).all()
-    return inventory
+    # Report the summed shard quantity for sharded products, including shards
+    # not yet folded back after sharding was turned off
+    totals = inventory_shards.shard_totals()
+    inventory = db.query(
+        Inventory,
+        func.coalesce(totals.c.quantity, Inventory.quantity).label('quantity')
+    ).outerjoin(
+        totals, totals.c.inventory_id == Inventory.id
+    ).offset(skip).limit(limit).all()
+    
+    return [
+        InventorySchema.model_validate(item.Inventory).model_copy(
+            update={"quantity": item.quantity}
+        )
+        for item in inventory
+    ]
 
 @router.get("/alerts", response_model=List[dict])
 def get_low_stock_alerts(db: Session = Depends(get_db)):
-    low_stock = db.query(
+    totals = inventory_shards.shard_totals()
+    quantity = func.coalesce(totals.c.quantity, Inventory.quantity)
+    query = db.query(
         Inventory,
         Product.name.label('product_name')
     ).join(
         Product, Inventory.product_id == Product.id
+    ).outerjoin(
+        totals, totals.c.inventory_id == Inventory.id
+    )
+    
+    low_stock = query.add_columns(
+        quantity.label('current_quantity')
     ).filter(
-        Inventory.quantity <= Inventory.low_stock_threshold
+        quantity <= Inventory.low_stock_threshold
     ).all()
     
     return [
         {
             "product_id": item.Inventory.product_id,
             "product_name": item.product_name,
-            "current_quantity": item.Inventory.quantity,
+            "current_quantity": item.current_quantity,
             "low_stock_threshold": item.Inventory.low_stock_threshold
         }
         for item in low_stock
@@ -59,21 +93,26 @@ def update_inventory(
     reason: str,
     db: Session = Depends(get_db)
 ):
-    inventory = db.query(Inventory).filter(Inventory.product_id == product_id).first()
+    inventory = db.execute(lambda_stmt(
+        lambda: select(Inventory).where(Inventory.product_id == product_id)
+    )).scalars().first()
     if not inventory:
         raise HTTPException(status_code=404, detail="Inventory not found")
     
-    previous_quantity = inventory.quantity
+    if settings.INVENTORY_SHARDING_ENABLED:
+        previous_quantity = inventory_shards.set_total_quantity(db, inventory.id, quantity)
+    else:
+        previous_quantity = inventory.quantity
     inventory.quantity = quantity
     
     # Create inventory history
-    history = InventoryHistory(
+    history_journal.record(
+        db,
         inventory_id=inventory.id,
         previous_quantity=previous_quantity,
         new_quantity=quantity,
         change_reason=reason
     )
-    db.add(history)
     
     db.commit()
     db.refresh(inventory)
@@ -86,14 +125,27 @@ def get_inventory_history(
     limit: int = 100,
     db: Session = Depends(get_db)
 ):
-    inventory = db.query(Inventory).filter(Inventory.product_id == product_id).first()
-    if not inventory:
+    inventory_id = db.execute(lambda_stmt(
+        lambda: select(Inventory.id).where(Inventory.product_id == product_id)
+    )).scalar()
+    if inventory_id is None:
         raise HTTPException(status_code=404, detail="Inventory not found")
     
+    pending = history_journal.pending_events(db, inventory_id)
+    
     history = db.query(InventoryHistory).filter(
-        InventoryHistory.inventory_id == inventory.id
+        InventoryHistory.inventory_id == inventory_id
     ).order_by(
         InventoryHistory.change_date.desc()
-    ).offset(skip).limit(limit).all()
+    )
+    
+    if not pending:
+        return history.offset(skip).limit(limit).all()
     
-    return history 
\ No newline at end of file
+    # Merge events still waiting in the journal with the flushed rows
+    merged = sorted(
+        [*history.limit(skip + limit).all(), *pending],
+        key=lambda item: item.change_date,
+        reverse=True
+    )
+    return merged[skip:skip + limit] 
\ No newline at end of file
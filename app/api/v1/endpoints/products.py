@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
+from sqlalchemy import lambda_stmt, select
 from typing import List
 from app.db.session import get_db
 from app.models.models import Product
@@ -22,7 +23,15 @@ def read_products(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)
 
 @router.get("/{product_id}", response_model=ProductSchema)
 def read_product(product_id: int, db: Session = Depends(get_db)):
-    db_product = db.query(Product).filter(Product.id == product_id).first()
+    db_product = db.execute(lambda_stmt(lambda: select(
+        Product.id,
+        Product.name,
+        Product.description,
+        Product.price,
+        Product.category_id,
+        Product.created_at,
+        Product.updated_at
+    ).where(Product.id == product_id))).mappings().first()
     if db_product is None:
         raise HTTPException(status_code=404, detail="Product not found")
     return db_product
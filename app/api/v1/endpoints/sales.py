@@ -1,56 +1,91 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import exists, func, lambda_stmt, select, update
 from typing import List
 from datetime import datetime, timedelta
-from app.db.session import get_db
+from app.core.admission import limit_date_range
+from app.core.config import settings
+from app.db.session import get_db, get_analytics_db
 from app.models.models import Sale, Product, Inventory
+from app.services import analytics_snapshot, history_journal, inventory_shards, sales_archive
 from app.schemas.schemas import SaleCreate, Sale as SaleSchema
 
 router = APIRouter()
 
 @router.post("/", response_model=SaleSchema)
 def create_sale(sale: SaleCreate, db: Session = Depends(get_db)):
-    # Check if product exists
-    product = db.query(Product).filter(Product.id == sale.product_id).first()
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
-    
-    # Check inventory
-    inventory = db.query(Inventory).filter(Inventory.product_id == sale.product_id).first()
-    if not inventory or inventory.quantity < sale.quantity:
+    product_id = sale.product_id
+    
+    # Check inventory; its foreign key means the product exists, so the
+    # product is only looked up to tell the two errors apart
+    inventory = db.execute(lambda_stmt(
+        lambda: select(Inventory.id).where(Inventory.product_id == product_id)
+    )).first()
+    if not inventory:
+        product_exists = db.execute(lambda_stmt(
+            lambda: select(exists().where(Product.id == product_id))
+        )).scalar()
+        if not product_exists:
+            raise HTTPException(status_code=404, detail="Product not found")
         raise HTTPException(status_code=400, detail="Insufficient inventory")
     
+    # Update inventory
+    if settings.INVENTORY_SHARDING_ENABLED:
+        change = inventory_shards.reserve_stock(db, inventory.id, sale.quantity)
+        if change is None:
+            raise HTTPException(status_code=400, detail="Insufficient inventory")
+        previous_quantity, new_quantity = change
+    else:
+        inventory_id = inventory.id
+        quantity = sale.quantity
+        
+        # Check and decrement in one statement so concurrent sales cannot
+        # both pass the stock check
+        result = db.execute(lambda_stmt(
+            lambda: update(Inventory).where(
+                Inventory.id == inventory_id,
+                Inventory.quantity >= quantity
+            ).values(quantity=Inventory.quantity - quantity)
+        ))
+        if result.rowcount == 0:
+            raise HTTPException(status_code=400, detail="Insufficient inventory")
+        # The UPDATE holds the row lock, so this is exactly the quantity it left
+        new_quantity = db.execute(lambda_stmt(
+            lambda: select(Inventory.quantity).where(Inventory.id == inventory_id)
+        )).scalar()
+        previous_quantity = new_quantity + quantity
+    
     # Create sale
     db_sale = Sale(**sale.model_dump())
     db.add(db_sale)
     
-    # Update inventory
-    inventory.quantity -= sale.quantity
-    
     # Create inventory history
-    from app.models.models import InventoryHistory
-    history = InventoryHistory(
+    history_journal.record(
+        db,
         inventory_id=inventory.id,
-        previous_quantity=inventory.quantity + sale.quantity,
-        new_quantity=inventory.quantity,
+        previous_quantity=previous_quantity,
+        new_quantity=new_quantity,
         change_reason=f"Sale of {sale.quantity} units"
     )
-    db.add(history)
     
+    # Every column has a client-side default, so the flushed sale is complete
+    # and the response does not need to reload it after the commit
+    db.flush()
+    created = SaleSchema.model_validate(db_sale)
     db.commit()
-    db.refresh(db_sale)
-    return db_sale
+    return created
 
 @router.get("/", response_model=List[SaleSchema])
 def read_sales(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     start_date: datetime = None,
     end_date: datetime = None,
     product_id: int = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_analytics_db)
 ):
+    start_date, end_date = limit_date_range(start_date, end_date, response)
     query = db.query(Sale)
     
     if start_date:
@@ -65,38 +100,67 @@ def read_sales(
 
 @router.get("/daily", response_model=List[dict])
 def get_daily_sales(
+    response: Response,
     days: int = 7,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_analytics_db)
 ):
     end_date = datetime.utcnow()
     start_date = end_date - timedelta(days=days)
+    start_date, end_date = limit_date_range(start_date, end_date, response)
     
-    daily_sales = db.query(
+    snapshot = analytics_snapshot.get_snapshot()
+    snapshot_days = snapshot.whole_days(start_date, end_date) if snapshot is not None else None
+    
+    query = db.query(
         func.date(Sale.sale_date).label('date'),
         func.sum(Sale.total_amount).label('total_sales'),
         func.sum(Sale.quantity).label('total_quantity')
     ).filter(
         Sale.sale_date >= start_date,
         Sale.sale_date <= end_date
-    ).group_by(
+    )
+    if snapshot_days:
+        # Whole days come from the snapshot, only the partial ones are queried
+        query = query.filter(analytics_snapshot.outside(snapshot_days))
+    
+    daily_sales = query.group_by(
         func.date(Sale.sale_date)
     ).all()
     
-    return [
-        {
+    days = {
+        str(sale.date): {
             "date": str(sale.date),
             "total_sales": float(sale.total_sales),
             "total_quantity": sale.total_quantity
         }
         for sale in daily_sales
-    ]
+    }
+    
+    if snapshot_days:
+        for day in snapshot.daily_totals(*snapshot_days):
+            totals = days.setdefault(
+                str(day["date"]), {"date": str(day["date"]), "total_sales": 0.0, "total_quantity": 0}
+            )
+            totals["total_sales"] += day["revenue"]
+            totals["total_quantity"] += day["quantity"]
+    
+    return sorted(days.values(), key=lambda day: day["date"])
 
 @router.get("/by-product", response_model=List[dict])
 def get_sales_by_product(
+    response: Response,
     start_date: datetime = None,
     end_date: datetime = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_analytics_db)
 ):
+    start_date, end_date = limit_date_range(start_date, end_date, response)
+    
+    hot_start = sales_archive.hot_start()
+    hot_start_date = sales_archive.hot_range_start(start_date, hot_start)
+    
+    snapshot = analytics_snapshot.get_snapshot()
+    snapshot_days = snapshot.whole_days(hot_start_date, end_date) if snapshot is not None else None
+    
     query = db.query(
         Product.id,
         Product.name,
@@ -106,19 +170,49 @@ def get_sales_by_product(
         Sale, Product.id == Sale.product_id
     )
     
-    if start_date:
-        query = query.filter(Sale.sale_date >= start_date)
+    if hot_start_date:
+        query = query.filter(Sale.sale_date >= hot_start_date)
     if end_date:
         query = query.filter(Sale.sale_date <= end_date)
+    if snapshot_days:
+        query = query.filter(analytics_snapshot.outside(snapshot_days))
     
     results = query.group_by(Product.id, Product.name).all()
     
-    return [
-        {
+    products = {
+        result.id: {
             "product_id": result.id,
             "product_name": result.name,
             "total_sales": float(result.total_sales),
             "total_quantity": result.total_quantity
         }
         for result in results
-    ] 
\ No newline at end of file
+    }
+    
+    if snapshot_days:
+        for product in snapshot.product_totals(*snapshot_days):
+            totals = products.setdefault(product["product_id"], {
+                "product_id": product["product_id"],
+                "product_name": product["product_name"],
+                "total_sales": 0.0,
+                "total_quantity": 0
+            })
+            totals["total_sales"] += product["revenue"]
+            totals["total_quantity"] += product["quantity"]
+    
+    # Add sales that were moved to the archive
+    archived_products = sales_archive.product_totals(start_date, end_date, hot_start)
+    names = sales_archive.product_names(db, set(archived_products) - set(products))
+    for product_id, archived in archived_products.items():
+        if product_id not in products and product_id not in names:
+            continue
+        totals = products.setdefault(product_id, {
+            "product_id": product_id,
+            "product_name": names.get(product_id),
+            "total_sales": 0.0,
+            "total_quantity": 0
+        })
+        totals["total_sales"] += archived["revenue"]
+        totals["total_quantity"] += archived["quantity"]
+    
+    return list(products.values()) 
\ No newline at end of file
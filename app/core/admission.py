@@ -0,0 +1,134 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+from app.core.config import settings
+
+ANALYTICS = "analytics"
+TRANSACTIONAL = "transactional"
+
+# Read routes that aggregate or scan the sales table
+ANALYTICS_PATHS = ("/sales/daily", "/sales/by-product")
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, detail: str):
+        self.status_code = status_code
+        self.detail = detail
+
+class RouteClassLimiter:
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.BoundedSemaphore(max_concurrency)
+        self._waiting = 0
+
+    async def acquire(self) -> float:
+        started = time.perf_counter()
+        if self._semaphore.locked() and self._waiting >= self.max_queue:
+            raise AdmissionRejected(429, f"Too many concurrent {self.name} requests")
+
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise AdmissionRejected(503, f"Timed out waiting for a {self.name} request slot")
+        finally:
+            self._waiting -= 1
+        return time.perf_counter() - started
+
+    def release(self):
+        self._semaphore.release()
+
+limiters = {
+    ANALYTICS: RouteClassLimiter(
+        ANALYTICS,
+        settings.ANALYTICS_MAX_CONCURRENCY,
+        settings.ANALYTICS_MAX_QUEUE,
+        settings.ADMISSION_QUEUE_TIMEOUT_SECONDS
+    ),
+    TRANSACTIONAL: RouteClassLimiter(
+        TRANSACTIONAL,
+        settings.TRANSACTIONAL_MAX_CONCURRENCY,
+        settings.TRANSACTIONAL_MAX_QUEUE,
+        settings.ADMISSION_QUEUE_TIMEOUT_SECONDS
+    ),
+}
+
+def route_class(request: Request) -> Optional[str]:
+    if not request.url.path.startswith(settings.API_V1_STR):
+        return None
+    path = request.url.path[len(settings.API_V1_STR):]
+    if path.startswith("/analytics/") or path in ANALYTICS_PATHS:
+        return ANALYTICS
+    if request.method == "GET" and path in ("/sales", "/sales/"):
+        return ANALYTICS
+    return TRANSACTIONAL
+
+async def admission_control(request: Request, call_next):
+    name = route_class(request)
+    if name is None:
+        return await call_next(request)
+
+    limiter = limiters[name]
+    headers = {
+        "X-Admission-Class": name,
+        "X-Admission-Limit": str(limiter.max_concurrency),
+    }
+    try:
+        waited = await limiter.acquire()
+    except AdmissionRejected as e:
+        headers["Retry-After"] = str(max(1, round(limiter.queue_timeout)))
+        return JSONResponse(status_code=e.status_code, content={"detail": e.detail}, headers=headers)
+
+    try:
+        response = await call_next(request)
+    finally:
+        limiter.release()
+    response.headers.update(headers)
+    response.headers["X-Admission-Queue-Ms"] = str(round(waited * 1000))
+    return response
+
+def _as_naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # sale_date is stored as naive UTC, and query parameters with an offset
+    # or a trailing Z parse as aware datetimes
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+def limit_date_range(
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    response: Response
+) -> Tuple[Optional[datetime], Optional[datetime]]:
+    start_date = _as_naive_utc(start_date)
+    end_date = _as_naive_utc(end_date)
+    if not settings.ANALYTICS_MAX_DATE_RANGE_DAYS:
+        return start_date, end_date
+    max_range = timedelta(days=settings.ANALYTICS_MAX_DATE_RANGE_DAYS)
+
+    if start_date is not None and end_date is not None:
+        if end_date - start_date > max_range:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Date range exceeds {settings.ANALYTICS_MAX_DATE_RANGE_DAYS} days"
+            )
+        return start_date, end_date
+
+    # Open-ended ranges are narrowed to the maximum window instead of
+    # scanning the whole sales table
+    if start_date is None:
+        end_date = end_date or datetime.utcnow()
+        start_date = end_date - max_range
+    elif start_date + max_range < datetime.utcnow():
+        end_date = start_date + max_range
+    else:
+        return start_date, end_date
+
+    response.headers["X-Date-Range-Clamped"] = "true"
+    response.headers["X-Date-Range-Start"] = start_date.isoformat()
+    response.headers["X-Date-Range-End"] = end_date.isoformat()
+    return start_date, end_date
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 
 class Settings(BaseSettings):
     PROJECT_NAME: str = "E-commerce Admin API"
@@ -16,6 +16,35 @@ class Settings(BaseSettings):
     # CORS Settings
     BACKEND_CORS_ORIGINS: List[str] = ["*"]
 
+    # Inventory Settings
+    INVENTORY_SHARDING_ENABLED: bool = False
+    INVENTORY_SHARD_COUNT: int = 8
+
+    # Analytics Snapshot Settings
+    ANALYTICS_SNAPSHOT_PATH: Optional[str] = None  # disabled when unset
+    ANALYTICS_SNAPSHOT_DAYS: int = 400
+    ANALYTICS_SNAPSHOT_REFRESH_SECONDS: int = 60
+    ANALYTICS_SNAPSHOT_MAX_AGE_SECONDS: int = 300
+
+    # Sales Archive Settings
+    SALES_ARCHIVE_DIR: Optional[str] = None  # disabled when unset
+    SALES_ARCHIVE_AFTER_MONTHS: int = 13
+
+    # Inventory History Journal Settings
+    INVENTORY_HISTORY_JOURNAL_DIR: Optional[str] = None  # disabled when unset
+    INVENTORY_HISTORY_FLUSH_INTERVAL_SECONDS: float = 1.0
+    INVENTORY_HISTORY_FLUSH_BATCH_SIZE: int = 500
+    INVENTORY_HISTORY_SEGMENT_MAX_BYTES: int = 64 * 1024 * 1024
+
+    # Admission Control Settings
+    ANALYTICS_MAX_CONCURRENCY: int = 4
+    ANALYTICS_MAX_QUEUE: int = 16
+    TRANSACTIONAL_MAX_CONCURRENCY: int = 64
+    TRANSACTIONAL_MAX_QUEUE: int = 256
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = 5.0
+    ANALYTICS_MAX_DATE_RANGE_DAYS: int = 366  # 0 disables the limit
+    ANALYTICS_STATEMENT_TIMEOUT_MS: int = 10000  # 0 disables the timeout
+
     class Config:
         env_file = ".env"  # optional: read variables from .env file
         case_sensitive = True
@@ -1,4 +1,5 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -7,12 +8,45 @@ from app.core.config import settings
 engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Analytics sessions share the connection pool but cap how long each SELECT may run
+analytics_engine = engine.execution_options(statement_timeout_ms=settings.ANALYTICS_STATEMENT_TIMEOUT_MS)
+AnalyticsSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=analytics_engine)
+
 Base = declarative_base()
 
+# MySQL error raised when MAX_EXECUTION_TIME interrupts a statement
+MYSQL_QUERY_TIMEOUT = 3024
+# MySQL error raised in the transaction InnoDB rolls back to break a deadlock
+MYSQL_DEADLOCK = 1213
+
+@event.listens_for(engine, "before_cursor_execute", retval=True)
+def apply_statement_timeout(conn, cursor, statement, parameters, context, executemany):
+    timeout_ms = conn.get_execution_options().get("statement_timeout_ms")
+    if timeout_ms and conn.dialect.name == "mysql":
+        stripped = statement.lstrip()
+        if stripped[:6].upper() == "SELECT":
+            statement = f"SELECT /*+ MAX_EXECUTION_TIME({int(timeout_ms)}) */{stripped[6:]}"
+    return statement, parameters
+
+def is_statement_timeout(exc: OperationalError) -> bool:
+    args = getattr(exc.orig, "args", ())
+    return bool(args) and args[0] == MYSQL_QUERY_TIMEOUT
+
+def is_deadlock(exc: OperationalError) -> bool:
+    args = getattr(exc.orig, "args", ())
+    return bool(args) and args[0] == MYSQL_DEADLOCK
+
 # Dependency
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+def get_analytics_db():
+    db = AnalyticsSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
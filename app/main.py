@@ -1,6 +1,11 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import OperationalError
+from app.core.admission import admission_control
 from app.core.config import settings
+from app.db.session import SessionLocal, is_statement_timeout
+from app.services import history_journal, inventory_shards
 from app.api.v1.api import api_router
 
 app = FastAPI(
@@ -9,6 +14,9 @@ app = FastAPI(
     openapi_url=f"{settings.API_V1_STR}/openapi.json"
 )
 
+# Shed load per route class before it reaches the database
+app.middleware("http")(admission_control)
+
 # Set up CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -18,9 +26,45 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(OperationalError)
+async def statement_timeout_handler(request: Request, exc: OperationalError):
+    if not is_statement_timeout(exc):
+        raise exc
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Query exceeded the statement timeout"},
+        headers={
+            "X-Statement-Timeout-Ms": str(settings.ANALYTICS_STATEMENT_TIMEOUT_MS),
+            "Retry-After": "5"
+        }
+    )
+
 # Include API router
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+@app.on_event("startup")
+def fold_back_inventory_shards():
+    # Sales only read the shards while sharding is enabled, so fold any that
+    # are left over back into Inventory.quantity once instead of per request
+    if not settings.INVENTORY_SHARDING_ENABLED:
+        db = SessionLocal()
+        try:
+            inventory_shards.collapse_all_shards(db)
+        finally:
+            db.close()
+
+history_flusher = history_journal.Flusher()
+
+@app.on_event("startup")
+def start_history_flusher():
+    if settings.INVENTORY_HISTORY_JOURNAL_DIR:
+        history_flusher.start()
+
+@app.on_event("shutdown")
+def stop_history_flusher():
+    if settings.INVENTORY_HISTORY_JOURNAL_DIR:
+        history_flusher.stop()
+
 @app.get("/")
 async def root():
     return {
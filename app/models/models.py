@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, BigInteger, String, Float, ForeignKey, DateTime, Text, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.session import Base
@@ -40,6 +40,18 @@ class Inventory(Base):
 
     product = relationship("Product", back_populates="inventory")
     history = relationship("InventoryHistory", back_populates="inventory")
+    shards = relationship("InventoryShard", back_populates="inventory")
+
+class InventoryShard(Base):
+    __tablename__ = "inventory_shards"
+    __table_args__ = (UniqueConstraint("inventory_id", "shard_index"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    inventory_id = Column(Integer, ForeignKey("inventory.id"), nullable=False)
+    shard_index = Column(Integer, nullable=False)
+    quantity = Column(Integer, default=0)
+
+    inventory = relationship("Inventory", back_populates="shards")
 
 class InventoryHistory(Base):
     __tablename__ = "inventory_history"
@@ -53,6 +65,12 @@ class InventoryHistory(Base):
 
     inventory = relationship("Inventory", back_populates="history")
 
+class InventoryHistoryJournalCheckpoint(Base):
+    __tablename__ = "inventory_history_journal_checkpoints"
+
+    segment = Column(String(255), primary_key=True)
+    flushed_bytes = Column(BigInteger, nullable=False, default=0)
+
 class Sale(Base):
     __tablename__ = "sales"
 
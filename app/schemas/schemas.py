@@ -62,7 +62,7 @@ class InventoryHistoryCreate(InventoryHistoryBase):
     inventory_id: int
 
 class InventoryHistory(InventoryHistoryBase):
-    id: int
+    id: Optional[int] = None  # unset for journaled events not yet written to the database
     inventory_id: int
     change_date: datetime
 
@@ -0,0 +1,297 @@
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.models import Sale, Product, Category
+from app.services import sales_archive
+
+# Sales aggregates are precomputed by scripts/refresh_analytics_snapshot.py into
+# one file per host. Every worker maps that file read-only, so the arrays live
+# once in the page cache no matter how many workers attach to it.
+#
+# File layout (little endian, every section 8-byte aligned):
+#   header
+#   product_ids          int64[n_products]
+#   product_categories   int64[n_products]   index into category_ids, -1 if none
+#   category_ids         int64[n_categories]
+#   revenue              float64[n_days, n_products]
+#   quantity             int64[n_days, n_products]
+#   orders               int64[n_days, n_products]
+#   names                utf-8 JSON {"products": [...], "categories": [...]}
+
+MAGIC = b"ECAS"
+FORMAT_VERSION = 1
+
+# magic, format version, flags (reserved), generation, built_at, base_day,
+# n_days, n_products, n_categories, names_len
+HEADER = struct.Struct("<4sHHQdqqqqq")
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+def _layout(n_days: int, n_products: int, n_categories: int) -> Dict[str, int]:
+    offsets = {}
+    offset = _align(HEADER.size)
+    for name, count in (
+        ("product_ids", n_products),
+        ("product_categories", n_products),
+        ("category_ids", n_categories),
+        ("revenue", n_days * n_products),
+        ("quantity", n_days * n_products),
+        ("orders", n_days * n_products),
+    ):
+        offsets[name] = offset
+        offset = _align(offset + count * 8)
+    offsets["names"] = offset
+    return offsets
+
+def _as_date(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value))
+
+def build_snapshot(db: Session, path: str, days: Optional[int] = None) -> str:
+    days = days or settings.ANALYTICS_SNAPSHOT_DAYS
+    built_at = time.time()
+    last_day = datetime.utcfromtimestamp(built_at).date()
+    base_day = last_day - timedelta(days=days - 1)
+
+    # Archived months are only in Parquet, so the window starts after them
+    archive_end = sales_archive.hot_start()
+    if archive_end is not None and archive_end.date() > base_day:
+        base_day = min(archive_end.date(), last_day)
+    window_start = datetime.combine(base_day, datetime.min.time())
+
+    products = db.query(Product.id, Product.name, Product.category_id).order_by(Product.id).all()
+    categories = db.query(Category.id, Category.name).order_by(Category.id).all()
+    product_index = {product.id: index for index, product in enumerate(products)}
+    category_index = {category.id: index for index, category in enumerate(categories)}
+
+    n_days = (last_day - base_day).days + 1
+    n_products = len(products)
+    n_categories = len(categories)
+    revenue = np.zeros((n_days, n_products), dtype=np.float64)
+    quantity = np.zeros((n_days, n_products), dtype=np.int64)
+    orders = np.zeros((n_days, n_products), dtype=np.int64)
+
+    daily_sales = db.query(
+        func.date(Sale.sale_date).label('date'),
+        Sale.product_id,
+        func.sum(Sale.total_amount).label('revenue'),
+        func.sum(Sale.quantity).label('quantity'),
+        func.count(Sale.id).label('order_count')
+    ).filter(
+        Sale.sale_date >= window_start
+    ).group_by(
+        func.date(Sale.sale_date),
+        Sale.product_id
+    ).all()
+
+    for row in daily_sales:
+        column = product_index.get(row.product_id)
+        day = (_as_date(row.date) - base_day).days
+        if column is None or not 0 <= day < n_days:
+            continue
+        revenue[day, column] = row.revenue or 0
+        quantity[day, column] = row.quantity or 0
+        orders[day, column] = row.order_count
+
+    names = json.dumps({
+        "products": [product.name for product in products],
+        "categories": [category.name for category in categories],
+    }).encode("utf-8")
+    sections = {
+        "product_ids": np.array([product.id for product in products], dtype=np.int64),
+        "product_categories": np.array(
+            [category_index.get(product.category_id, -1) for product in products],
+            dtype=np.int64
+        ),
+        "category_ids": np.array([category.id for category in categories], dtype=np.int64),
+        "revenue": revenue,
+        "quantity": quantity,
+        "orders": orders,
+    }
+    offsets = _layout(n_days, n_products, n_categories)
+    header = HEADER.pack(
+        MAGIC, FORMAT_VERSION, 0, time.time_ns(), built_at, base_day.toordinal(),
+        n_days, n_products, n_categories, len(names)
+    )
+
+    # Write next to the live file and swap it in, so attached workers keep
+    # reading the previous version until they pick up the new one
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        for name, array in sections.items():
+            f.seek(offsets[name])
+            f.write(np.ascontiguousarray(array).tobytes())
+        f.seek(offsets["names"])
+        f.write(names)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return path
+
+class AnalyticsSnapshot:
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (
+            magic, version, flags, self.generation, self.built_at, base_day,
+            n_days, n_products, n_categories, names_len
+        ) = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} analytics snapshot")
+
+        self.base_day = date.fromordinal(base_day)
+        self.n_days = n_days
+        offsets = _layout(n_days, n_products, n_categories)
+
+        def view(name, dtype, count):
+            return np.frombuffer(self._mmap, dtype=dtype, count=count, offset=offsets[name])
+
+        self.product_ids = view("product_ids", np.int64, n_products)
+        self.product_categories = view("product_categories", np.int64, n_products)
+        self.category_ids = view("category_ids", np.int64, n_categories)
+        self.revenue = view("revenue", np.float64, n_days * n_products).reshape(n_days, n_products)
+        self.quantity = view("quantity", np.int64, n_days * n_products).reshape(n_days, n_products)
+        self.orders = view("orders", np.int64, n_days * n_products).reshape(n_days, n_products)
+
+        names = json.loads(bytes(self._mmap[offsets["names"]:offsets["names"] + names_len]))
+        self.product_names = names["products"]
+        self.category_names = names["categories"]
+
+    def is_fresh(self) -> bool:
+        return time.time() - self.built_at <= settings.ANALYTICS_SNAPSHOT_MAX_AGE_SECONDS
+
+    def whole_days(self, start_date: Optional[datetime], end_date: Optional[datetime]) -> Optional[Tuple[date, date]]:
+        # Only days that lie entirely inside the range and had already ended
+        # when the snapshot was built; callers query the partial days at
+        # either end from the database
+        first = self.base_day
+        if start_date is not None:
+            first = max(first, (start_date - timedelta(microseconds=1)).date() + timedelta(days=1))
+        last = datetime.utcfromtimestamp(self.built_at).date() - timedelta(days=1)
+        if end_date is not None:
+            last = min(last, (end_date + timedelta(microseconds=1)).date() - timedelta(days=1))
+        if first > last:
+            return None
+        return first, last
+
+    def _days(self, first_day: date, last_day: date) -> slice:
+        return slice((first_day - self.base_day).days, (last_day - self.base_day).days + 1)
+
+    def daily_totals(self, first_day: date, last_day: date) -> List[dict]:
+        days = self._days(first_day, last_day)
+        revenue = self.revenue[days].sum(axis=1)
+        quantity = self.quantity[days].sum(axis=1)
+        orders = self.orders[days].sum(axis=1)
+        first = days.start
+        return [
+            {
+                "date": self.base_day + timedelta(days=int(first + offset)),
+                "revenue": float(revenue[offset]),
+                "quantity": int(quantity[offset]),
+                "order_count": int(orders[offset])
+            }
+            for offset in np.flatnonzero(orders)
+        ]
+
+    def monthly_totals(self, first_day: date, last_day: date) -> List[dict]:
+        months = {}
+        for day in self.daily_totals(first_day, last_day):
+            month = months.setdefault(
+                (day["date"].year, day["date"].month),
+                {"year": day["date"].year, "month": day["date"].month, "revenue": 0.0, "order_count": 0}
+            )
+            month["revenue"] += day["revenue"]
+            month["order_count"] += day["order_count"]
+        return list(months.values())
+
+    def total_revenue(self, first_day: date, last_day: date) -> float:
+        return float(self.revenue[self._days(first_day, last_day)].sum())
+
+    def product_totals(self, first_day: date, last_day: date) -> List[dict]:
+        days = self._days(first_day, last_day)
+        revenue = self.revenue[days].sum(axis=0)
+        quantity = self.quantity[days].sum(axis=0)
+        orders = self.orders[days].sum(axis=0)
+        return [
+            {
+                "product_id": int(self.product_ids[column]),
+                "product_name": self.product_names[column],
+                "revenue": float(revenue[column]),
+                "quantity": int(quantity[column])
+            }
+            for column in np.flatnonzero(orders)
+        ]
+
+    def category_totals(self, first_day: date, last_day: date) -> List[dict]:
+        days = self._days(first_day, last_day)
+        sold = (self.orders[days].sum(axis=0) > 0) & (self.product_categories >= 0)
+        categories = self.product_categories[sold]
+        n_categories = len(self.category_ids)
+        revenue = np.bincount(
+            categories, weights=self.revenue[days].sum(axis=0)[sold], minlength=n_categories
+        )
+        quantity = np.bincount(
+            categories, weights=self.quantity[days].sum(axis=0)[sold], minlength=n_categories
+        )
+        return [
+            {
+                "category_id": int(self.category_ids[index]),
+                "category_name": self.category_names[index],
+                "revenue": float(revenue[index]),
+                "quantity": int(quantity[index])
+            }
+            for index in np.unique(categories)
+        ]
+
+_lock = threading.Lock()
+_attached = None
+_attached_key = None
+
+def get_snapshot() -> Optional[AnalyticsSnapshot]:
+    global _attached, _attached_key
+
+    path = settings.ANALYTICS_SNAPSHOT_PATH
+    if not path:
+        return None
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+
+    # Re-attach only when the refresher has swapped in a new file
+    key = (stat.st_ino, stat.st_mtime_ns)
+    with _lock:
+        if key != _attached_key:
+            try:
+                _attached = AnalyticsSnapshot(path)
+            except (OSError, ValueError):
+                _attached = None
+            _attached_key = key
+        snapshot = _attached
+
+    if snapshot is None or not snapshot.is_fresh():
+        return None
+    return snapshot
+
+def outside(days: Tuple[date, date]):
+    # Filter for the rows a query still has to read around the snapshot's whole days
+    first_day, last_day = days
+    return or_(
+        Sale.sale_date < datetime.combine(first_day, datetime.min.time()),
+        Sale.sale_date >= datetime.combine(last_day + timedelta(days=1), datetime.min.time())
+    )
@@ -0,0 +1,298 @@
+import fcntl
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.models import InventoryHistory, InventoryHistoryJournalCheckpoint
+from app.schemas.schemas import InventoryHistory as InventoryHistorySchema
+
+# With INVENTORY_HISTORY_JOURNAL_DIR set, inventory history events are not
+# inserted in the request transaction. Once the transaction commits they are
+# appended to a per-process segment file in the journal directory and fsynced,
+# with concurrent writers sharing one fsync. A background flusher bulk-inserts
+# them into inventory_history and records how far each segment has been
+# written in inventory_history_journal_checkpoints, in the same transaction.
+#
+# A writer holds a shared flock on its open segment. A segment that can be
+# locked exclusively has no writer left and is deleted once fully flushed.
+# Segments are created and locked under a .tmp name the flusher ignores, and
+# only then renamed into place.
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = "pending_inventory_history"
+FLUSH_LOCK = ".flush.lock"
+
+class HistoryJournal:
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.pid = os.getpid()
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._file = None
+        self._written = 0
+        self._synced = 0
+
+    def _open_segment(self):
+        path = self.directory / f"{socket.gethostname()}-{self.pid}-{time.time_ns()}.jsonl"
+        tmp_path = path.with_name(f"{path.name}.tmp")
+        self._file = open(tmp_path, "ab")
+        fcntl.flock(self._file, fcntl.LOCK_SH)
+        os.replace(tmp_path, path)
+
+    def _close_segment(self):
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+
+    def _abandon_segment(self):
+        # After a failed write the segment may end in a partial line, so later
+        # events go to a new segment. Keep what was written before it durable.
+        try:
+            os.fsync(self._file.fileno())
+            self._file.close()
+        except OSError:
+            pass
+        self._file = None
+
+    def append(self, events: List[dict]):
+        data = b"".join(json.dumps(item).encode("utf-8") + b"\n" for item in events)
+        with self._lock:
+            if self._file is None or self._file.tell() >= settings.INVENTORY_HISTORY_SEGMENT_MAX_BYTES:
+                self._close_segment()
+                self._open_segment()
+            try:
+                self._file.write(data)
+                self._file.flush()
+            except OSError:
+                self._abandon_segment()
+                raise
+            self._written += 1
+            sequence = self._written
+
+        # Group commit: whoever gets the sync lock fsyncs everything written so
+        # far, and writers queued behind it usually find their events covered
+        with self._sync_lock:
+            if self._synced >= sequence:
+                return
+            with self._lock:
+                if self._file is None:
+                    return
+                target = self._written
+                fd = os.dup(self._file.fileno())
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            self._synced = target
+
+    def close(self):
+        with self._lock:
+            self._close_segment()
+
+_journal = None
+_journal_lock = threading.Lock()
+
+def get_journal() -> HistoryJournal:
+    global _journal
+    with _journal_lock:
+        # Forked workers must not share the parent's segment
+        if _journal is None or _journal.pid != os.getpid():
+            _journal = HistoryJournal(settings.INVENTORY_HISTORY_JOURNAL_DIR)
+        return _journal
+
+def record(
+    db: Session,
+    inventory_id: int,
+    previous_quantity: int,
+    new_quantity: int,
+    change_reason: str
+):
+    if not settings.INVENTORY_HISTORY_JOURNAL_DIR:
+        db.add(InventoryHistory(
+            inventory_id=inventory_id,
+            previous_quantity=previous_quantity,
+            new_quantity=new_quantity,
+            change_reason=change_reason
+        ))
+        return
+
+    db.info.setdefault(PENDING_KEY, []).append({
+        "inventory_id": inventory_id,
+        "previous_quantity": previous_quantity,
+        "new_quantity": new_quantity,
+        "change_date": datetime.utcnow().isoformat(),
+        "change_reason": change_reason
+    })
+
+@event.listens_for(Session, "after_commit")
+def _journal_committed_events(session):
+    events = session.info.pop(PENDING_KEY, None)
+    if not events:
+        return
+    # The change itself is already committed, so a journal failure must not
+    # fail the request; the events are logged so they can be restored
+    try:
+        get_journal().append(events)
+    except OSError:
+        logger.exception("Could not journal inventory history events: %s", json.dumps(events))
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_events(session):
+    session.info.pop(PENDING_KEY, None)
+
+def _parse(data: bytes) -> List[dict]:
+    events = []
+    for line in data.splitlines():
+        item = json.loads(line)
+        item["change_date"] = datetime.fromisoformat(item["change_date"])
+        events.append(item)
+    return events
+
+def _read_from(path: Path, start: int) -> bytes:
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read()
+    # Leave a line that is still being written for the next pass
+    return data[:data.rfind(b"\n") + 1]
+
+def _has_writer(path: Path) -> bool:
+    with open(path, "rb") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return True
+        fcntl.flock(f, fcntl.LOCK_UN)
+    return False
+
+def _is_local(segment: str) -> bool:
+    # Segments are named <host>-<pid>-<ns>.jsonl, and hostnames may contain dashes
+    return segment.rsplit("-", 2)[0] == socket.gethostname()
+
+def _segments(directory: Path) -> List[Path]:
+    return sorted(directory.glob("*.jsonl"))
+
+def pending_events(db: Session, inventory_id: int) -> List[InventoryHistorySchema]:
+    if not settings.INVENTORY_HISTORY_JOURNAL_DIR:
+        return []
+
+    while True:
+        # Read the checkpoints in the caller's transaction so they match the
+        # inventory_history rows it reads next
+        checkpoints = {
+            row.segment: row.flushed_bytes
+            for row in db.query(InventoryHistoryJournalCheckpoint).all()
+        }
+        events = []
+        for path in _segments(Path(settings.INVENTORY_HISTORY_JOURNAL_DIR)):
+            try:
+                data = _read_from(path, checkpoints.get(path.name, 0))
+            except FileNotFoundError:
+                # Flushed and deleted since the checkpoints were read, so its
+                # rows are not visible to this transaction: start a new one.
+                # Callers only read before this, so nothing is lost.
+                db.rollback()
+                break
+            events.extend(
+                InventoryHistorySchema(**item)
+                for item in _parse(data)
+                if item["inventory_id"] == inventory_id
+            )
+        else:
+            return events
+
+def flush() -> int:
+    directory = Path(settings.INVENTORY_HISTORY_JOURNAL_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / FLUSH_LOCK, "a") as lock_file:
+        # Only one worker per host flushes at a time
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return 0
+
+        db = SessionLocal()
+        try:
+            return _flush_segments(db, directory)
+        finally:
+            db.close()
+
+def _flush_segments(db: Session, directory: Path) -> int:
+    checkpoints = {
+        row.segment: row
+        for row in db.query(InventoryHistoryJournalCheckpoint).all()
+    }
+    flushed = 0
+    segments = _segments(directory)
+    for path in segments:
+        checkpoint = checkpoints.get(path.name)
+        if checkpoint is None:
+            checkpoint = InventoryHistoryJournalCheckpoint(segment=path.name, flushed_bytes=0)
+            db.add(checkpoint)
+            db.flush()
+            checkpoints[path.name] = checkpoint
+
+        has_writer = _has_writer(path)
+        lines = _read_from(path, checkpoint.flushed_bytes).splitlines(keepends=True)
+        for offset in range(0, len(lines), settings.INVENTORY_HISTORY_FLUSH_BATCH_SIZE):
+            batch = lines[offset:offset + settings.INVENTORY_HISTORY_FLUSH_BATCH_SIZE]
+            db.execute(insert(InventoryHistory), _parse(b"".join(batch)))
+            checkpoint.flushed_bytes += sum(len(line) for line in batch)
+            db.commit()
+            flushed += len(batch)
+
+        # A segment with no writer left is complete once its lines are flushed.
+        # Anything after its last newline is from a write that failed part way.
+        if not has_writer:
+            if checkpoint.flushed_bytes < path.stat().st_size:
+                logger.warning("Dropping incomplete last line of inventory history segment %s", path.name)
+            path.unlink()
+            db.delete(checkpoint)
+            db.commit()
+
+    # Drop checkpoints whose segment was deleted before its row was. Other
+    # hosts' segments are not in this directory, so their checkpoints stay.
+    live = {path.name for path in segments if path.exists()}
+    for name, checkpoint in checkpoints.items():
+        if _is_local(name) and name not in live and checkpoint in db:
+            db.delete(checkpoint)
+    db.commit()
+    return flushed
+
+class Flusher:
+    def __init__(self):
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="inventory-history-flusher", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        # The first pass replays whatever earlier processes left behind
+        while True:
+            try:
+                flush()
+            except Exception:
+                logger.exception("Error flushing inventory history journal")
+            if self._stop.wait(settings.INVENTORY_HISTORY_FLUSH_INTERVAL_SECONDS):
+                return
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        get_journal().close()
+        flush()
@@ -0,0 +1,201 @@
+import random
+from typing import List, Optional, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.db.session import is_deadlock
+from app.models.models import Inventory, InventoryShard
+
+# A sharded product keeps its stock in INVENTORY_SHARD_COUNT counter rows so
+# concurrent sales lock different rows instead of queueing on one Inventory row.
+# Once shards exist their sum is the product's quantity; Inventory.quantity is
+# only refreshed on explicit updates, or when a worker starts with sharding
+# turned off and collapse_all_shards folds the shards back into it.
+#
+# A sale that finds no single shard able to cover it locks all shards, possibly
+# while still holding the shard it tried first. Two such sales can deadlock;
+# InnoDB then rolls back one of them, which retries from the start.
+
+DEADLOCK_RETRIES = 3
+
+def split_quantity(quantity: int, shard_count: int) -> List[int]:
+    base, remainder = divmod(quantity, shard_count)
+    return [base + (1 if index < remainder else 0) for index in range(shard_count)]
+
+def shard_totals():
+    return select(
+        InventoryShard.inventory_id.label('inventory_id'),
+        func.sum(InventoryShard.quantity).label('quantity')
+    ).group_by(
+        InventoryShard.inventory_id
+    ).subquery()
+
+def get_total_quantity(db: Session, inventory_id: int) -> int:
+    total = db.query(func.sum(InventoryShard.quantity)).filter(
+        InventoryShard.inventory_id == inventory_id
+    ).scalar()
+    if total is None:
+        total = db.query(Inventory.quantity).filter(Inventory.id == inventory_id).scalar()
+    return total or 0
+
+def ensure_shards(db: Session, inventory_id: int) -> List[int]:
+    indexes = [
+        row.shard_index
+        for row in db.query(InventoryShard.shard_index).filter(
+            InventoryShard.inventory_id == inventory_id
+        ).all()
+    ]
+    if indexes:
+        return indexes
+
+    # Lock the inventory row so only one request splits it into shards
+    inventory = db.query(Inventory).filter(
+        Inventory.id == inventory_id
+    ).with_for_update().first()
+    indexes = [
+        row.shard_index
+        for row in db.query(InventoryShard.shard_index).filter(
+            InventoryShard.inventory_id == inventory_id
+        ).all()
+    ]
+    if indexes:
+        return indexes
+
+    quantities = split_quantity(inventory.quantity or 0, settings.INVENTORY_SHARD_COUNT)
+    db.add_all([
+        InventoryShard(inventory_id=inventory_id, shard_index=index, quantity=quantity)
+        for index, quantity in enumerate(quantities)
+    ])
+    db.flush()
+    return list(range(len(quantities)))
+
+def _lock_all_shards(db: Session, inventory_id: int) -> List[InventoryShard]:
+    # Always lock in shard_index order so rebalances holding no other shard
+    # cannot deadlock with each other
+    return db.query(InventoryShard).filter(
+        InventoryShard.inventory_id == inventory_id
+    ).order_by(
+        InventoryShard.shard_index
+    ).with_for_update().all()
+
+def _redistribute(shards: List[InventoryShard], quantity: int):
+    for shard, shard_quantity in zip(shards, split_quantity(quantity, len(shards))):
+        shard.quantity = shard_quantity
+
+def _lock_shard(db: Session, inventory_id: int, index: int, skip_locked: bool) -> Optional[InventoryShard]:
+    return db.query(InventoryShard).filter(
+        InventoryShard.inventory_id == inventory_id,
+        InventoryShard.shard_index == index
+    ).with_for_update(skip_locked=skip_locked).first()
+
+def _refill(db: Session, inventory_id: int, shard: InventoryShard):
+    # Move half of the fullest shard nobody is holding into the emptied one.
+    # Busy shards are skipped rather than waited on while the sale holds its own.
+    donors = db.query(InventoryShard).filter(
+        InventoryShard.inventory_id == inventory_id,
+        InventoryShard.shard_index != shard.shard_index,
+        InventoryShard.quantity > 1
+    ).order_by(
+        InventoryShard.quantity.desc()
+    ).limit(1).with_for_update(skip_locked=True).all()
+    if donors:
+        moved = donors[0].quantity // 2
+        donors[0].quantity -= moved
+        shard.quantity += moved
+
+def _take(db: Session, inventory_id: int, shard: InventoryShard, quantity: int) -> Tuple[int, int]:
+    shard.quantity -= quantity
+    if shard.quantity == 0:
+        _refill(db, inventory_id, shard)
+    db.flush()
+    # The other shards are not locked, so this total also reflects sales
+    # committed on them meanwhile; the history quantities are approximate
+    new_quantity = get_total_quantity(db, inventory_id)
+    return new_quantity + quantity, new_quantity
+
+def _retry_on_deadlock(db: Session, operation, *args):
+    # InnoDB has rolled back the whole transaction, so the operation must be
+    # the first write of its transaction to be safely run again
+    for attempt in range(DEADLOCK_RETRIES):
+        try:
+            return operation(db, *args)
+        except OperationalError as e:
+            if attempt == DEADLOCK_RETRIES - 1 or not is_deadlock(e):
+                raise
+            db.rollback()
+
+def _reserve_stock(db: Session, inventory_id: int, quantity: int) -> Optional[Tuple[int, int]]:
+    ensure_shards(db, inventory_id)
+    candidates = [
+        row.shard_index
+        for row in db.query(InventoryShard.shard_index).filter(
+            InventoryShard.inventory_id == inventory_id,
+            InventoryShard.quantity >= quantity
+        ).all()
+    ]
+    random.shuffle(candidates)
+
+    # Start with a random shard and fall back to the others, skipping any
+    # shard another sale is currently holding
+    busy = 0
+    for index in candidates:
+        shard = _lock_shard(db, inventory_id, index, skip_locked=True)
+        if shard is None:
+            busy += 1
+            continue
+        if shard.quantity >= quantity:
+            return _take(db, inventory_id, shard, quantity)
+
+    # Every candidate was busy: wait for one of them instead of locking
+    # all shards, which would serialize the sales sharding is meant to spread
+    if candidates and busy == len(candidates):
+        shard = _lock_shard(db, inventory_id, candidates[0], skip_locked=False)
+        if shard is not None and shard.quantity >= quantity:
+            return _take(db, inventory_id, shard, quantity)
+
+    # No single shard can cover the sale: take it from the combined stock
+    # and rebalance what is left evenly, refilling empty shards
+    shards = _lock_all_shards(db, inventory_id)
+    previous_quantity = sum(shard.quantity for shard in shards)
+    if previous_quantity < quantity:
+        return None
+    _redistribute(shards, previous_quantity - quantity)
+    db.flush()
+    return previous_quantity, previous_quantity - quantity
+
+def reserve_stock(db: Session, inventory_id: int, quantity: int) -> Optional[Tuple[int, int]]:
+    return _retry_on_deadlock(db, _reserve_stock, inventory_id, quantity)
+
+def _set_total_quantity(db: Session, inventory_id: int, quantity: int) -> int:
+    ensure_shards(db, inventory_id)
+    shards = _lock_all_shards(db, inventory_id)
+    previous_quantity = sum(shard.quantity for shard in shards)
+    _redistribute(shards, quantity)
+    db.flush()
+    return previous_quantity
+
+def set_total_quantity(db: Session, inventory_id: int, quantity: int) -> int:
+    # Can be picked as the victim of a sale's deadlock
+    return _retry_on_deadlock(db, _set_total_quantity, inventory_id, quantity)
+
+def collapse_shards(db: Session, inventory_id: int) -> Optional[int]:
+    shards = _lock_all_shards(db, inventory_id)
+    if not shards:
+        return None
+    total = sum(shard.quantity for shard in shards)
+    db.query(Inventory).filter(Inventory.id == inventory_id).update({"quantity": total})
+    for shard in shards:
+        db.delete(shard)
+    db.flush()
+    return total
+
+def collapse_all_shards(db: Session) -> int:
+    inventory_ids = [
+        row.inventory_id
+        for row in db.query(InventoryShard.inventory_id).distinct().all()
+    ]
+    for inventory_id in inventory_ids:
+        collapse_shards(db, inventory_id)
+        db.commit()
+    return len(inventory_ids)
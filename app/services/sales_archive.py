@@ -0,0 +1,262 @@
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.models import Sale, Product, Category
+
+# Sales older than SALES_ARCHIVE_AFTER_MONTHS are moved out of MySQL into one
+# Parquet directory per month:
+#   <SALES_ARCHIVE_DIR>/sales/year=2024/month=03/part-<first id>-<last id>.parquet
+# Analytics endpoints add aggregates over these cold partitions to their SQL
+# results, reading only the months that overlap the requested range.
+#
+# A request reads hot_start() once. Its SQL query only covers sales from that
+# moment on and the archive only the partitions before it, so a month that is
+# being archived is counted once even while its rows are still being deleted.
+
+SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("product_id", pa.int64()),
+    ("quantity", pa.int64()),
+    ("total_amount", pa.float64()),
+    ("sale_date", pa.timestamp("us")),
+    ("created_at", pa.timestamp("us")),
+])
+
+DELETE_BATCH_SIZE = 1000
+
+def _add_months(year: int, month: int, months: int) -> Tuple[int, int]:
+    index = year * 12 + (month - 1) + months
+    return index // 12, index % 12 + 1
+
+def _partition_dir(year: int, month: int) -> Path:
+    return Path(settings.SALES_ARCHIVE_DIR) / "sales" / f"year={year}" / f"month={month:02d}"
+
+def archive_cutoff(now: Optional[datetime] = None) -> datetime:
+    now = now or datetime.utcnow()
+    year, month = _add_months(now.year, now.month, -settings.SALES_ARCHIVE_AFTER_MONTHS)
+    return datetime(year, month, 1)
+
+def list_partitions() -> List[Tuple[int, int]]:
+    if not settings.SALES_ARCHIVE_DIR:
+        return []
+    root = Path(settings.SALES_ARCHIVE_DIR) / "sales"
+    partitions = []
+    for month_dir in root.glob("year=*/month=*"):
+        if any(month_dir.glob("*.parquet")):
+            year = int(month_dir.parent.name.split("=")[1])
+            month = int(month_dir.name.split("=")[1])
+            partitions.append((year, month))
+    return sorted(partitions)
+
+def hot_start() -> Optional[datetime]:
+    # First moment that is guaranteed to still be in the sales table
+    partitions = list_partitions()
+    if not partitions:
+        return None
+    year, month = _add_months(*partitions[-1], 1)
+    return datetime(year, month, 1)
+
+def hot_range_start(start_date: Optional[datetime], hot_start: Optional[datetime]) -> Optional[datetime]:
+    # Where the SQL part of a federated query starts
+    if hot_start is None or (start_date is not None and start_date >= hot_start):
+        return start_date
+    return hot_start
+
+def _as_naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Partitions and the sale_date column hold naive UTC timestamps
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+def _prune(
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    hot_start: Optional[datetime]
+) -> List[Path]:
+    files = []
+    if hot_start is None:
+        return files
+    for year, month in list_partitions():
+        month_start = datetime(year, month, 1)
+        month_end = datetime(*_add_months(year, month, 1), 1)
+        if month_start >= hot_start:
+            continue
+        if start_date is not None and month_end <= start_date:
+            continue
+        if end_date is not None and month_start > end_date:
+            continue
+        files.extend(sorted(_partition_dir(year, month).glob("*.parquet")))
+    return files
+
+def read_cold_sales(
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    hot_start: Optional[datetime],
+    columns: List[str]
+) -> Optional[pa.Table]:
+    start_date = _as_naive_utc(start_date)
+    end_date = _as_naive_utc(end_date)
+    files = _prune(start_date, end_date, hot_start)
+    if not files:
+        return None
+
+    table = pa.concat_tables([
+        pq.read_table(path, columns=list({*columns, "sale_date"})) for path in files
+    ])
+    if start_date is not None:
+        table = table.filter(pc.greater_equal(table["sale_date"], pa.scalar(start_date, pa.timestamp("us"))))
+    if end_date is not None:
+        table = table.filter(pc.less_equal(table["sale_date"], pa.scalar(end_date, pa.timestamp("us"))))
+    return table
+
+def monthly_totals(
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    hot_start: Optional[datetime]
+) -> Dict[Tuple[int, int], dict]:
+    table = read_cold_sales(start_date, end_date, hot_start, ["id", "total_amount"])
+    if table is None or table.num_rows == 0:
+        return {}
+    table = table.append_column("year", pc.year(table["sale_date"])).append_column(
+        "month", pc.month(table["sale_date"])
+    )
+    grouped = table.group_by(["year", "month"]).aggregate([("total_amount", "sum"), ("id", "count")])
+    return {
+        (row["year"], row["month"]): {"revenue": row["total_amount_sum"], "order_count": row["id_count"]}
+        for row in grouped.to_pylist()
+    }
+
+def total_revenue(
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    hot_start: Optional[datetime]
+) -> float:
+    table = read_cold_sales(start_date, end_date, hot_start, ["total_amount"])
+    if table is None or table.num_rows == 0:
+        return 0.0
+    return pc.sum(table["total_amount"]).as_py()
+
+def product_totals(
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    hot_start: Optional[datetime]
+) -> Dict[int, dict]:
+    table = read_cold_sales(start_date, end_date, hot_start, ["product_id", "total_amount", "quantity"])
+    if table is None or table.num_rows == 0:
+        return {}
+    grouped = table.group_by("product_id").aggregate([("total_amount", "sum"), ("quantity", "sum")])
+    return {
+        row["product_id"]: {"revenue": row["total_amount_sum"], "quantity": row["quantity_sum"]}
+        for row in grouped.to_pylist()
+        if row["product_id"] is not None
+    }
+
+def product_names(db: Session, product_ids) -> Dict[int, str]:
+    return {
+        row.id: row.name
+        for row in db.query(Product.id, Product.name).filter(Product.id.in_(list(product_ids))).all()
+    }
+
+def category_totals(
+    db: Session,
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    hot_start: Optional[datetime]
+) -> Dict[int, dict]:
+    products = product_totals(start_date, end_date, hot_start)
+    if not products:
+        return {}
+
+    # Archived sales are attributed to the product's current category,
+    # matching the join the SQL query does for hot sales
+    categories = {}
+    for row in db.query(Product.id, Category.id.label('category_id'), Category.name).join(
+        Category, Category.id == Product.category_id
+    ).filter(Product.id.in_(list(products))).all():
+        totals = categories.setdefault(
+            row.category_id, {"category_name": row.name, "revenue": 0.0, "quantity": 0}
+        )
+        totals["revenue"] += products[row.id]["revenue"]
+        totals["quantity"] += products[row.id]["quantity"]
+    return categories
+
+def _archived_ids(year: int, month: int) -> set:
+    ids = set()
+    for path in _partition_dir(year, month).glob("*.parquet"):
+        ids.update(pq.read_table(path, columns=["id"])["id"].to_pylist())
+    return ids
+
+def archive_month(db: Session, year: int, month: int) -> int:
+    month_start = datetime(year, month, 1)
+    month_end = datetime(*_add_months(year, month, 1), 1)
+
+    # Rows written by an earlier run that died before deleting them are
+    # not written again, only deleted
+    archived = _archived_ids(year, month)
+    partition = _partition_dir(year, month)
+    tmp_path = partition / f".part-{os.getpid()}.tmp"
+    writer = None
+    first_id = last_id = None
+    ids = []
+
+    # Stream the month instead of loading it into memory at once
+    result = db.execute(select(
+        Sale.id, Sale.product_id, Sale.quantity, Sale.total_amount, Sale.sale_date, Sale.created_at
+    ).where(
+        Sale.sale_date >= month_start,
+        Sale.sale_date < month_end
+    ).order_by(Sale.id).execution_options(yield_per=DELETE_BATCH_SIZE))
+    try:
+        for rows in result.partitions():
+            ids.extend(row.id for row in rows)
+            new_rows = [row._asdict() for row in rows if row.id not in archived]
+            if not new_rows:
+                continue
+            if writer is None:
+                partition.mkdir(parents=True, exist_ok=True)
+                writer = pq.ParquetWriter(tmp_path, SCHEMA, compression="zstd")
+                first_id = new_rows[0]["id"]
+            writer.write_table(pa.Table.from_pylist(new_rows, schema=SCHEMA))
+            last_id = new_rows[-1]["id"]
+    except BaseException:
+        if writer is not None:
+            writer.close()
+            tmp_path.unlink()
+        raise
+    if writer is not None:
+        writer.close()
+        os.replace(tmp_path, partition / f"part-{first_id}-{last_id}.parquet")
+
+    # Readers stop querying the month once its partition exists, so the rows
+    # can be deleted in short transactions instead of one month-long one
+    for offset in range(0, len(ids), DELETE_BATCH_SIZE):
+        db.execute(delete(Sale).where(Sale.id.in_(ids[offset:offset + DELETE_BATCH_SIZE])))
+        db.commit()
+    return len(ids)
+
+def archive_sales(db: Session, before: Optional[datetime] = None) -> Dict[Tuple[int, int], int]:
+    if not settings.SALES_ARCHIVE_DIR:
+        raise ValueError("SALES_ARCHIVE_DIR is not configured")
+    before = before or archive_cutoff()
+    before = datetime(before.year, before.month, 1)
+    first_sale = db.query(Sale.sale_date).filter(
+        Sale.sale_date < before
+    ).order_by(Sale.sale_date).first()
+    if first_sale is None:
+        return {}
+
+    archived = {}
+    year, month = first_sale.sale_date.year, first_sale.sale_date.month
+    while datetime(year, month, 1) < before:
+        count = archive_month(db, year, month)
+        if count:
+            archived[(year, month)] = count
+        year, month = _add_months(year, month, 1)
+    return archived
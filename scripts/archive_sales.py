@@ -0,0 +1,37 @@
+import sys
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+# Add the parent directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.services.sales_archive import archive_cutoff, archive_sales
+
+# Moves sales older than SALES_ARCHIVE_AFTER_MONTHS into monthly Parquet
+# partitions under SALES_ARCHIVE_DIR. Safe to re-run after a failure.
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive old sales to Parquet and delete them from the database")
+    parser.add_argument("--before", type=datetime.fromisoformat, default=None,
+                        help="archive whole months before this date (default: the configured cutoff)")
+    args = parser.parse_args()
+
+    if not settings.SALES_ARCHIVE_DIR:
+        parser.error("set SALES_ARCHIVE_DIR to enable the sales archive")
+
+    before = args.before or archive_cutoff()
+    session = SessionLocal()
+    try:
+        archived = archive_sales(session, before)
+    finally:
+        session.close()
+
+    for (year, month), count in archived.items():
+        print(f"Archived {count} sales from {year}-{month:02d}")
+    print(f"Archived {sum(archived.values())} sales before {before:%Y-%m}")
+
+if __name__ == "__main__":
+    main()
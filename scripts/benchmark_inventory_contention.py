@@ -0,0 +1,103 @@
+import sys
+import argparse
+import threading
+import time
+from pathlib import Path
+
+# Add the parent directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from app.core.config import settings
+from app.db.session import Base, SessionLocal
+from app.models.models import Category, Product, Inventory
+from app.schemas.schemas import SaleCreate
+from app.api.v1.endpoints.sales import create_sale
+
+# Hammers create_sale for a single product from many threads, once against the
+# single Inventory row and once with sharded counters. Run it against a scratch
+# MySQL database: it inserts products, sales and history rows.
+
+def create_hot_product(quantity):
+    session = SessionLocal()
+    try:
+        category = session.query(Category).filter(Category.name == "Benchmark").first()
+        if category is None:
+            category = Category(name="Benchmark", description="Contention benchmark products")
+            session.add(category)
+            session.flush()
+        product = Product(
+            name=f"Flash sale product {time.time_ns()}",
+            price=10.0,
+            category_id=category.id
+        )
+        session.add(product)
+        session.flush()
+        session.add(Inventory(product_id=product.id, quantity=quantity, low_stock_threshold=0))
+        session.commit()
+        return product.id
+    finally:
+        session.close()
+
+def run(sharded, threads, duration, quantity):
+    settings.INVENTORY_SHARDING_ENABLED = sharded
+    product_id = create_hot_product(quantity)
+    counts = {"ok": 0, "insufficient": 0, "errors": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        local = {"ok": 0, "insufficient": 0, "errors": 0}
+        while time.perf_counter() < deadline:
+            db = SessionLocal()
+            try:
+                create_sale(SaleCreate(product_id=product_id, quantity=1, total_amount=10.0), db)
+                local["ok"] += 1
+            except HTTPException:
+                local["insufficient"] += 1
+            except Exception:
+                db.rollback()
+                local["errors"] += 1
+            finally:
+                db.close()
+        with lock:
+            for key, value in local.items():
+                counts[key] += value
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    label = f"sharded ({settings.INVENTORY_SHARD_COUNT} shards)" if sharded else "single row"
+    print(
+        f"{label:<22} {counts['ok'] / elapsed:10.1f} sales/s  "
+        f"ok={counts['ok']} insufficient={counts['insufficient']} errors={counts['errors']}"
+    )
+    return counts["ok"] / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare create_sale throughput for single-row and sharded inventory")
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--shards", type=int, default=settings.INVENTORY_SHARD_COUNT)
+    parser.add_argument("--quantity", type=int, default=10_000_000)
+    args = parser.parse_args()
+
+    settings.INVENTORY_SHARD_COUNT = args.shards
+    # One pooled connection per thread so pool checkout is not the bottleneck
+    bench_engine = create_engine(settings.DATABASE_URL, pool_size=args.threads, max_overflow=0)
+    SessionLocal.configure(bind=bench_engine)
+    Base.metadata.create_all(bind=bench_engine)
+
+    single = run(False, args.threads, args.duration, args.quantity)
+    sharded = run(True, args.threads, args.duration, args.quantity)
+    if single:
+        print(f"speedup: {sharded / single:.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import sys
+import argparse
+import time
+from pathlib import Path
+
+# Add the parent directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from fastapi import HTTPException
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.models import Category, Product, Inventory, InventoryHistory, Sale
+from app.schemas.schemas import SaleCreate
+from app.api.v1.endpoints.products import read_product
+from app.api.v1.endpoints.sales import create_sale
+
+# Measures the CPU time spent per request in read_product and create_sale,
+# comparing the endpoints with the Query API versions they replaced. Run it
+# against a scratch database populated by scripts/init_db.py: the create_sale
+# runs insert sales and history rows.
+
+def legacy_read_product(product_id, db):
+    db_product = db.query(Product).filter(Product.id == product_id).first()
+    if db_product is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return db_product
+
+def legacy_create_sale(sale, db):
+    product = db.query(Product).filter(Product.id == sale.product_id).first()
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+
+    inventory = db.query(Inventory).filter(Inventory.product_id == sale.product_id).first()
+    if not inventory or inventory.quantity < sale.quantity:
+        raise HTTPException(status_code=400, detail="Insufficient inventory")
+
+    db_sale = Sale(**sale.model_dump())
+    db.add(db_sale)
+    inventory.quantity -= sale.quantity
+    db.add(InventoryHistory(
+        inventory_id=inventory.id,
+        previous_quantity=inventory.quantity + sale.quantity,
+        new_quantity=inventory.quantity,
+        change_reason=f"Sale of {sale.quantity} units"
+    ))
+    db.commit()
+    db.refresh(db_sale)
+    return db_sale
+
+def create_stocked_product(quantity):
+    session = SessionLocal()
+    try:
+        category = session.query(Category).filter(Category.name == "Benchmark").first()
+        if category is None:
+            category = Category(name="Benchmark", description="Query overhead benchmark products")
+            session.add(category)
+            session.flush()
+        product = Product(name=f"Benchmark product {time.time_ns()}", price=10.0, category_id=category.id)
+        session.add(product)
+        session.flush()
+        session.add(Inventory(product_id=product.id, quantity=quantity, low_stock_threshold=0))
+        session.commit()
+        return product.id
+    finally:
+        session.close()
+
+def measure(call, product_ids, iterations):
+    # Warm the connection pool and the compiled statement cache
+    for product_id in product_ids:
+        db = SessionLocal()
+        call(product_id, db)
+        db.close()
+
+    started = time.process_time()
+    for i in range(iterations):
+        db = SessionLocal()
+        try:
+            call(product_ids[i % len(product_ids)], db)
+        finally:
+            db.close()
+    return (time.process_time() - started) / iterations * 1_000_000
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-request CPU time of the endpoints and their Query API versions")
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+
+    # Measure the single-row inventory path with history written in the request
+    settings.INVENTORY_SHARDING_ENABLED = False
+    settings.INVENTORY_HISTORY_JOURNAL_DIR = None
+
+    session = SessionLocal()
+    try:
+        product_ids = [row.id for row in session.query(Product.id).limit(100).all()]
+    finally:
+        session.close()
+    if not product_ids:
+        parser.error("no products found, run scripts/init_db.py first")
+    sale_product_ids = [create_stocked_product(10 * (args.iterations + 1))]
+
+    def sale(product_id):
+        return SaleCreate(product_id=product_id, quantity=1, total_amount=10.0)
+
+    for name, ids, legacy, current in (
+        ("read_product", product_ids, legacy_read_product, read_product),
+        (
+            "create_sale",
+            sale_product_ids,
+            lambda product_id, db: legacy_create_sale(sale(product_id), db),
+            lambda product_id, db: create_sale(sale(product_id), db)
+        ),
+    ):
+        before = measure(legacy, ids, args.iterations)
+        after = measure(current, ids, args.iterations)
+        print(f"{name:<14} legacy {before:8.1f} us  current {after:8.1f} us  ({before / after:.2f}x)")
+
+if __name__ == "__main__":
+    main()
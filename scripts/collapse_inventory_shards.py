@@ -0,0 +1,31 @@
+import sys
+import argparse
+from pathlib import Path
+
+# Add the parent directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.services.inventory_shards import collapse_all_shards
+
+# Folds every product's inventory shards back into inventory.quantity. Workers
+# do this at startup when sharding is disabled; run it once more after turning
+# sharding off if sharded workers were still serving during the switch.
+
+def main():
+    parser = argparse.ArgumentParser(description="Fold inventory shards back into the inventory table")
+    parser.parse_args()
+
+    if settings.INVENTORY_SHARDING_ENABLED:
+        parser.error("INVENTORY_SHARDING_ENABLED is set; turn sharding off first")
+
+    session = SessionLocal()
+    try:
+        collapsed = collapse_all_shards(session)
+    finally:
+        session.close()
+    print(f"Folded shards back for {collapsed} products")
+
+if __name__ == "__main__":
+    main()
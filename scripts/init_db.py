@@ -6,7 +6,7 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 
 from app.db.session import engine, Base
-from app.models.models import Category, Product, Inventory, Sale, InventoryHistory
+from app.models.models import Category, Product, Inventory, InventoryShard, Sale, InventoryHistory, InventoryHistoryJournalCheckpoint
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 import random
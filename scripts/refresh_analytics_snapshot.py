@@ -0,0 +1,48 @@
+import sys
+import argparse
+import time
+from pathlib import Path
+
+# Add the parent directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.services.analytics_snapshot import build_snapshot
+
+# Run one refresher per host next to the API workers. Workers attach to the
+# published file on their next analytics request.
+
+def refresh(path, days):
+    session = SessionLocal()
+    try:
+        started = time.perf_counter()
+        build_snapshot(session, path, days)
+        print(f"Published analytics snapshot to {path} in {time.perf_counter() - started:.2f}s")
+    finally:
+        session.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the shared analytics snapshot for API workers")
+    parser.add_argument("--path", default=settings.ANALYTICS_SNAPSHOT_PATH)
+    parser.add_argument("--days", type=int, default=settings.ANALYTICS_SNAPSHOT_DAYS)
+    parser.add_argument("--interval", type=int, default=settings.ANALYTICS_SNAPSHOT_REFRESH_SECONDS)
+    parser.add_argument("--once", action="store_true")
+    args = parser.parse_args()
+
+    if not args.path:
+        parser.error("set ANALYTICS_SNAPSHOT_PATH or pass --path")
+
+    while True:
+        try:
+            refresh(args.path, args.days)
+        except Exception as e:
+            if args.once:
+                raise
+            print(f"Error refreshing analytics snapshot: {e}")
+        if args.once:
+            break
+        time.sleep(args.interval)
+
+if __name__ == "__main__":
+    main()